@@ -0,0 +1,127 @@
+"""Helpers shared by the FinRAGas Streamlit apps."""
+import secrets
+import json
+import http.cookiejar
+from collections import deque
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Chat history kept per session, and how much of it is rendered on every rerun
+MAX_HISTORY_MESSAGES = 50
+VISIBLE_HISTORY_MESSAGES = 20
+# Chunk types of n8n's streaming response mode
+STREAM_CHUNK_TYPES = ("begin", "item", "end", "error")
+
+def generate_session_id():
+    # Random 32-char hex id for the n8n chat memory; one syscall, no UUID object
+    return secrets.token_hex(16)
+
+def new_chat_history():
+    return deque(maxlen=MAX_HISTORY_MESSAGES)
+
+def display_chat_history(messages, older_label="Rodyti ankstesnes žinutes"):
+    # Only the latest messages are rendered on every rerun; older ones only
+    # when the user asks for them
+    messages = list(messages)
+    older = messages[:-VISIBLE_HISTORY_MESSAGES]
+    if older and st.toggle(older_label, key="show_older_messages"):
+        for message in older:
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+    for message in messages[-VISIBLE_HISTORY_MESSAGES:]:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+@st.cache_resource
+def get_http_session(bearer_token=None):
+    # One keep-alive session per process (and token), so chat turns reuse the
+    # open TLS connection to the n8n webhook
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        # Retry the POST only when it cannot have reached the agent: connection
+        # failures and 503. After a read timeout, 502 or 504 the agent may already
+        # have run and stored the turn, so it is not replayed. Retry-After is
+        # ignored so a 503 cannot hold the script for as long as the server asks.
+        max_retries=Retry(
+            total=2,
+            connect=2,
+            read=0,
+            backoff_factor=0.3,
+            status_forcelist=[503],
+            allowed_methods=["POST"],
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+    ))
+    # The session is shared by every user of this process, so it must not
+    # keep cookies: a Set-Cookie from one user's turn would go out on the next
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    session.headers["Content-Type"] = "application/json"
+    if bearer_token:
+        session.headers["Authorization"] = f"Bearer {bearer_token}"
+    return session
+
+def stream_message_to_llm(webhook_url, session_id, message, bearer_token=None, headers=None, errors=None, inline_errors=True):
+    # Yields the answer as the webhook sends it. Understands n8n's streaming
+    # response mode (one JSON chunk per line, optionally as SSE "data:" lines)
+    # and falls back to the regular single {"output": ...} body.
+    # Failures are shown as an "Error: ..." chunk (its own paragraph if part of
+    # the answer came first) and, if the caller passes an `errors` list, recorded
+    # there too, so the caller can tell a complete answer from a broken one.
+    # With inline_errors=False they are only recorded, for the caller to show.
+    started = False
+
+    def fail(text):
+        if errors is not None:
+            errors.append(text)
+        if not inline_errors:
+            return ""
+        return f"\n\nError: {text}" if started else f"Error: {text}"
+
+    payload = {
+        "sessionId": session_id,
+        "chatInput": message
+    }
+    try:
+        with get_http_session(bearer_token).post(webhook_url, json=payload, headers=headers, stream=True, timeout=(3.05, 60)) as response:
+            if response.status_code != 200:
+                yield fail(f"{response.status_code} - {response.text}")
+                return
+            # n8n sends UTF-8 but does not always declare the charset
+            if "charset" not in response.headers.get("Content-Type", ""):
+                response.encoding = "utf-8"
+
+            body = []
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("data:"):
+                    line = line[5:].strip()
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except ValueError:
+                    chunk = None
+                if isinstance(chunk, dict) and chunk.get("type") in STREAM_CHUNK_TYPES:
+                    if chunk["type"] == "item":
+                        started = True
+                        yield chunk.get("content", "")
+                    elif chunk["type"] == "error":
+                        yield fail(chunk.get('content', ''))
+                else:
+                    body.append(line)
+            if body:
+                # A 200 is not always the agent's answer, e.g. n8n's "Workflow was
+                # started" or an HTML page from a proxy in front of it
+                try:
+                    output = json.loads("\n".join(body))["output"]
+                except KeyError:
+                    output = "Sorry, I couldn't generate a response."
+                except (ValueError, TypeError):
+                    output = fail("unexpected response from the webhook")
+                yield output
+    except requests.exceptions.RequestException as e:
+        yield fail(str(e))
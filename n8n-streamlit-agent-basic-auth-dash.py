@@ -1,76 +1,187 @@
 import streamlit as st
-import requests
-import uuid
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from datetime import datetime, timedelta
-from supabase import create_client
+import httpx
+from supabase import ClientOptions, create_client
+from chat_utils import display_chat_history, generate_session_id, new_chat_history, stream_message_to_llm
 
 # Constants
 WEBHOOK_URL = st.secrets["WEBHOOK_URL"] 
 BEARER_TOKEN = st.secrets["BEARER_TOKEN"]
-SUPABASE_URL = st.secrets["SUPABASE_URL"]
-SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
+# Random lb_docs-shaped data instead of Supabase, for working on the dashboard
+# without database access; the Supabase secrets are then not needed
+USE_MOCK = st.secrets.get("USE_MOCK", False)
+SUPABASE_URL = None if USE_MOCK else st.secrets["SUPABASE_URL"]
+SUPABASE_KEY = None if USE_MOCK else st.secrets["SUPABASE_KEY"]
+# Only the columns the dashboard reads
+DOCS_COLUMNS = ['created_at', 'doc_id', 'company_short', 'decision', 'product', 'LB_complaint_case', 'decision_date']
+# Per-date-range aggregates and figures kept in memory; every slider position is a new entry
+CHART_CACHE_ENTRIES = 64
+# Rows per Supabase request; PostgREST caps a single response at 1000 rows by default
+DOCS_PAGE_SIZE = 1000
+# Companies drawn as their own trace in the monthly chart; the rest are stacked as "Other"
+MONTHLY_TOP_COMPANIES = 11
 
-def generate_session_id():
-    return str(uuid.uuid4())
+@st.cache_resource
+def get_supabase():
+    # One client per process, so its HTTP connection pool is kept between
+    # reruns; a hung PostgREST request fails after 10s instead of blocking the page
+    return create_client(
+        SUPABASE_URL,
+        SUPABASE_KEY,
+        options=ClientOptions(postgrest_client_timeout=httpx.Timeout(10.0, connect=3.0))
+    )
 
-def send_message_to_llm(session_id, message):
-    headers = {
-        "Authorization": f"Bearer {BEARER_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "sessionId": session_id,
-        "chatInput": message
+def iter_doc_pages(page_size=DOCS_PAGE_SIZE):
+    # Read the table in row ranges until an empty page comes back, so results
+    # are never cut off at the server's row cap. Newest first, sorted by
+    # Postgres so pandas does not have to; doc_id keeps page boundaries stable.
+    start = 0
+    while True:
+        response = (
+            get_supabase().table('lb_docs_processed')
+            .select(','.join(DOCS_COLUMNS))
+            .order('created_at', desc=True)
+            .order('doc_id')
+            .range(start, start + page_size - 1)
+            .execute()
+        )
+        if not response.data:
+            break
+        yield response.data
+        start += len(response.data)
+
+def load_supabase_docs():
+    frames = [pd.DataFrame(page) for page in iter_doc_pages()]
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+def load_mock_docs(rows=500):
+    # Same columns and string formats as the Supabase rows
+    rng = np.random.default_rng()
+    now = pd.Timestamp.now(tz='UTC')
+    decision_dates = now.normalize() - pd.to_timedelta(rng.integers(0, 730, rows), unit='D')
+    # Processed up to 30 days after the decision, but never in the future
+    created_at = decision_dates + pd.to_timedelta(rng.integers(1, 30 * 24 * 3600, rows), unit='s')
+    created_at = created_at.where(created_at <= now, now)
+    return pd.DataFrame({
+        'created_at': created_at.strftime('%Y-%m-%dT%H:%M:%S+00:00'),
+        'doc_id': [f'mock-{i}' for i in range(rows)],
+        'company_short': rng.choice([f'Company {c}' for c in 'ABCDEFGHIJKLMNOP'], rows),
+        'decision': rng.choice(['Tenkinti', 'Atmesti', 'Iš dalies tenkinti', 'Nutraukti'], rows),
+        'product': rng.choice(['KASKO', 'TPVCA', 'Būsto draudimas', 'Gyvybės draudimas', 'Kelionių draudimas'], rows),
+        'LB_complaint_case': [f'MOCK-{i:05d}' for i in range(rows)],
+        'decision_date': decision_dates.strftime('%Y-%m-%d')
+    })
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_docs():
+    # Load all processed documents from Supabase (or mock data); the date range
+    # is applied client-side by the dashboard slider
+    df = load_mock_docs() if USE_MOCK else load_supabase_docs()
+    if df is None:
+        # Return empty DataFrame with expected columns if no data
+        return pd.DataFrame(columns=['Date'] + DOCS_COLUMNS[1:] + ['Month'])
+    
+    df['Date'] = pd.to_datetime(df['created_at'], format='ISO8601', utc=True, cache=True)
+
+    # Parse decision dates and derive their month once here, not per date range
+    df['decision_date'] = pd.to_datetime(df['decision_date'], format='ISO8601', errors='coerce', cache=True)
+    df['Month'] = df['decision_date'].dt.strftime('%Y-%m')
+    
+    # Select and rename relevant columns
+    df = df[['Date', 'doc_id', 'company_short', 'decision', 'product', 'LB_complaint_case', 'decision_date', 'Month']]
+
+    # Low-cardinality labels as categoricals, so counting by them works on integer codes;
+    # the free-text ids as Arrow strings instead of Python str objects
+    df = df.astype({
+        'company_short': 'category',
+        'decision': 'category',
+        'product': 'category',
+        'doc_id': 'string[pyarrow]',
+        'LB_complaint_case': 'string[pyarrow]',
+        'Month': 'category'
+    })
+    
+    return df
+
+@st.cache_data(ttl=300, max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def aggregate_docs(start_datetime, end_datetime):
+    # Everything the metrics and charts show, computed once per date range
+    # instead of on every rerun
+    df = load_docs()
+    mask = (df['decision_date'] >= start_datetime) & (df['decision_date'] <= end_datetime)
+    # Only the columns the aggregates read are carried into the filtered frame
+    filtered_df = df.loc[mask, ['Date', 'company_short', 'decision', 'Month']]
+
+    # One trace per company gets slow past a dozen or so, so small companies
+    # are folded into a single "Other" trace; only when that saves a trace,
+    # since folding a single company would just lose its name
+    company_counts = filtered_df.groupby('company_short', observed=True).size()
+    monthly_df = filtered_df
+    if len(company_counts) > MONTHLY_TOP_COMPANIES + 1:
+        top_companies = company_counts.nlargest(MONTHLY_TOP_COMPANIES).index
+        companies = filtered_df['company_short'].astype(object)
+        monthly_df = filtered_df.assign(company_short=companies.where(companies.isin(top_companies) | companies.isna(), 'Other'))
+
+    return {
+        'total_docs': len(filtered_df),
+        'first_doc': filtered_df['Date'].min(),
+        'latest_doc': filtered_df['Date'].max(),
+        'docs_by_company': company_counts.sort_values(ascending=True).tail(10),
+        # Long (Month, key, n) frames: only the non-empty cells, no dense pivot
+        'monthly_company': monthly_df.groupby(['Month', 'company_short'], sort=False, observed=True).size().reset_index(name='n'),
+        'monthly_decisions': filtered_df.groupby(['Month', 'decision'], sort=False, observed=True).size().reset_index(name='n')
     }
-    response = requests.post(WEBHOOK_URL, json=payload, headers=headers)
-    #print (response.json())
-    if response.status_code == 200:
-        return response.json()["output"]
-    else:
-        return f"Error: {response.status_code} - {response.text}"
+
+# Figures are cached on the aggregate they are drawn from, so reruns with
+# unchanged data skip the plotly build
+@st.cache_data(ttl=300, max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def build_top_fig(counts, title, label):
+    return px.bar(
+        x=counts.values,
+        y=counts.index,
+        title=title,
+        labels={'x': 'Number of Documents', 'y': label},
+        orientation='h'
+    )
+
+@st.cache_data(ttl=300, max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def build_monthly_fig(monthly, key, title, label):
+    # The aggregates come out in row order, so fix the trace order (and with it
+    # the colours) to sorted keys with "Other" last, and the months to date order
+    keys = sorted(monthly[key].unique(), key=lambda k: (k == 'Other', k))
+    fig = px.bar(
+        monthly,
+        x='Month',
+        y='n',
+        color=key,
+        title=title,
+        labels={'n': 'Number of Documents', 'Month': 'Month', key: label},
+        category_orders={key: keys, 'Month': sorted(monthly['Month'].unique())},
+        barmode='stack'
+    )
+    fig.update_layout(
+        xaxis_title="Month",
+        yaxis_title="Number of Documents",
+        showlegend=True,
+        legend_title=label
+    )
+    return fig
 
 class Dashboard:
     def __init__(self):
-        self.supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        self.df = self.load_data_from_supabase()
-        self.filtered_df = self.df.copy()
-
-    def load_data_from_supabase(self):
-        # Load last 30 days of data from Supabase
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=30)
-        
-        # Query Supabase table
-        response = self.supabase.table('lb_docs_processed').select('*').execute()
-        if len(response.data) == 0:
-            # Return empty DataFrame with expected columns if no data
-            return pd.DataFrame({
-                'Date': [],
-                'Queries': [],
-                'Response_Time': [],
-                'Satisfaction': []
-            })
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(response.data)
-        df['Date'] = pd.to_datetime(df['created_at'])
-        
-        # Select and rename relevant columns
-        df = df[['Date', 'doc_id', 'company_short', 'decision', 'product', 'LB_complaint_case', 'decision_date']]
-        
-        # Sort by date
-        df = df.sort_values('Date', ascending=False)
-        
-        return df
+        # Cached across reruns and sessions, refreshed from Supabase every 5 minutes
+        self.df = load_docs()
+        self.stats = None
 
     def display_metrics(self):
-        # Calculate summary metrics
-        total_docs = len(self.filtered_df)
-        unique_companies = self.filtered_df['company_short'].nunique()
-        latest_doc = self.filtered_df['Date'].max().strftime('%Y-%m-%d')
-        first_doc = self.filtered_df['Date'].min().strftime('%Y-%m-%d')
+        # Summary metrics
+        total_docs = self.stats['total_docs']
+        latest_doc = self.stats['latest_doc'].strftime('%Y-%m-%d')
+        first_doc = self.stats['first_doc'].strftime('%Y-%m-%d')
         
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -81,9 +192,7 @@ class Dashboard:
             st.metric("Last Document", f"{latest_doc}")
 
     def update_filter(self, start_datetime, end_datetime):
-        decision_dates = pd.to_datetime(self.df['decision_date'])
-        mask = (decision_dates >= start_datetime) & (decision_dates <= end_datetime)
-        self.filtered_df = self.df[mask]
+        self.stats = aggregate_docs(start_datetime, end_datetime)
 
     def display_charts(self):
         # Display recent documents table
@@ -102,68 +211,85 @@ class Dashboard:
         # )
 
         # Documents by company chart
-        docs_by_company = self.filtered_df['company_short'].value_counts().sort_values(ascending=True).tail(10)
-        fig_company = px.bar(
-            x=docs_by_company.values,
-            y=docs_by_company.index,
-            title='Top 10 Companies by Document Count',
-            labels={'x': 'Number of Documents', 'y': 'Company'},
-            orientation='h'
-        )
+        fig_company = build_top_fig(self.stats['docs_by_company'], 'Top 10 Companies by Document Count', 'Company')
         st.plotly_chart(fig_company, use_container_width=True)
 
-        # Documents by product type
-        docs_by_product = self.filtered_df['product'].value_counts().head(10)
-        fig_product = px.bar(
-            x=docs_by_product.values,
-            y=docs_by_product.index,
-            title='Top 10 Product Types',
-            labels={'x': 'Number of Documents', 'y': 'Product Type'},
-            orientation='h'
-        )
+        # Documents by product type (needs 'product' and 'docs_by_product' back in aggregate_docs)
+        # fig_product = build_top_fig(self.stats['docs_by_product'], 'Top 10 Product Types', 'Product Type')
         # st.plotly_chart(fig_product, use_container_width=True)
 
-        # Monthly documents by company stacked area chart
-        df_monthly = self.filtered_df.copy()
-        df_monthly['Month'] = pd.to_datetime(df_monthly['decision_date']).dt.to_period('M').astype(str)
-        
         # Company stacked chart
-        monthly_company = pd.crosstab(df_monthly['Month'], df_monthly['company_short'])
-        fig_monthly_company = px.bar(
-            monthly_company,
-            title='Monthly Documents by Company',
-            labels={'value': 'Number of Documents', 'Month': 'Month', 'company_short': 'Company'},
-            barmode='stack'
-        )
-        fig_monthly_company.update_layout(
-            xaxis_title="Month",
-            yaxis_title="Number of Documents",
-            showlegend=True,
-            legend_title="Company"
-        )
+        fig_monthly_company = build_monthly_fig(self.stats['monthly_company'], 'company_short', 'Monthly Documents by Company', 'Company')
         st.plotly_chart(fig_monthly_company, use_container_width=True)
         
         # Monthly decisions chart
-        monthly_decisions = pd.crosstab(df_monthly['Month'], df_monthly['decision'])
-        fig_monthly_decisions = px.bar(
-            monthly_decisions,
-            title='Monthly Decisions',
-            labels={'value': 'Number of Documents', 'Month': 'Month', 'decision': 'Decision Type'},
-            barmode='stack'
-        )
-        fig_monthly_decisions.update_layout(
-            xaxis_title="Month",
-            yaxis_title="Number of Documents",
-            showlegend=True,
-            legend_title="Decision Type"
-        )
+        fig_monthly_decisions = build_monthly_fig(self.stats['monthly_decisions'], 'decision', 'Monthly Decisions', 'Decision Type')
         st.plotly_chart(fig_monthly_decisions, use_container_width=True)
 
+# Each panel is a fragment: moving the slider reruns only the dashboard and
+# sending a message reruns only the chat, not the whole page
+@st.fragment
+def dashboard_panel():
+    st.subheader("Dashboard")
+    dashboard = Dashboard()
+    # Add date range slider
+    min_date = dashboard.df['decision_date'].min().date()
+    max_date = dashboard.df['decision_date'].max().date()
+    
+    dates = st.slider(
+        "Select Date Range",
+        min_value=min_date,
+        max_value=max_date,
+        value=(min_date, max_date),
+        format="YYYY-MM-DD"
+    )
+    start_date, end_date = dates
+    
+    # Update filtered data based on date range
+    start_datetime = pd.to_datetime(start_date)
+    end_datetime = pd.to_datetime(end_date) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    dashboard.update_filter(start_datetime, end_datetime)
+    
+    # Display metrics and charts
+    dashboard.display_metrics()
+    
+    # Charts in expandable section
+    with st.expander("Show Charts", expanded=True):
+        dashboard.display_charts()
+
+@st.fragment
+def chat_panel():
+    with st.container(border=True):
+
+        # Display chat messages
+        display_chat_history(st.session_state.messages)
+
+        # User input
+        user_input = st.chat_input("Type your message here...")
+
+        if user_input:
+            # Add user message to chat history
+            st.session_state.messages.append({"role": "user", "content": user_input})
+            with st.chat_message("user"):
+                st.write(user_input)
+
+            # Stream the LLM response into the chat, spinner on until it is complete
+            errors = []
+            with st.chat_message("assistant"):
+                with st.spinner('Sekundėlę ...'):
+                    llm_response = st.write_stream(
+                        stream_message_to_llm(WEBHOOK_URL, st.session_state.session_id, user_input, bearer_token=BEARER_TOKEN, errors=errors)
+                    )
+            
+            # Add LLM response to chat history; a failed turn is shown once and not kept
+            if not errors:
+                st.session_state.messages.append({"role": "assistant", "content": llm_response})
+
 def main():
     st.set_page_config(layout="wide")
     # Initialize session state
     if "messages" not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = new_chat_history()
     if "session_id" not in st.session_state:
         st.session_state.session_id = generate_session_id()
 
@@ -178,60 +304,11 @@ def main():
 
     # Dashboard container on the left
     with dash_col:
-        st.subheader("Dashboard")
-        dashboard = Dashboard()
-        # Add date range slider
-        min_date = pd.to_datetime(dashboard.df['decision_date']).min().date()
-        max_date = pd.to_datetime(dashboard.df['decision_date']).max().date()
-        
-        dates = st.slider(
-            "Select Date Range",
-            min_value=min_date,
-            max_value=max_date,
-            value=(min_date, max_date),
-            format="YYYY-MM-DD"
-        )
-        start_date, end_date = dates
-        
-        # Update filtered data based on date range
-        start_datetime = pd.to_datetime(start_date)
-        end_datetime = pd.to_datetime(end_date) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-        dashboard.update_filter(start_datetime, end_datetime)
-        
-        # Display metrics and charts
-        dashboard.display_metrics()
-        
-        # Charts in expandable section
-        with st.expander("Show Charts", expanded=True):
-            dashboard.display_charts()
+        dashboard_panel()
 
     # Chat interface on the right
     with chat_col:
-        with st.container(border=True):
-
-            # Display chat messages
-            for message in st.session_state.messages:
-                with st.chat_message(message["role"]):
-                    st.write(message["content"])
-
-            # User input
-            user_input = st.chat_input("Type your message here...")
-
-            if user_input:
-                # Add user message to chat history
-                st.session_state.messages.append({"role": "user", "content": user_input})
-                with st.chat_message("user"):
-                    st.write(user_input)
-
-                # Get LLM response with spinner on while waiting
-                with st.spinner('Sekundėlę ...'):
-                    llm_response = send_message_to_llm(st.session_state.session_id, user_input)
-                
-                # Add LLM response to chat history
-                st.session_state.messages.append({"role": "assistant", "content": llm_response})
-                
-                with st.chat_message("assistant"):
-                    st.write(llm_response)
+        chat_panel()
 
 if __name__ == "__main__":
     main()
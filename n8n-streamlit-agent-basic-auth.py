@@ -1,45 +1,23 @@
 import streamlit as st
-import requests
-import uuid
+from chat_utils import display_chat_history, generate_session_id, new_chat_history, stream_message_to_llm
 
 # Constants
 WEBHOOK_URL = st.secrets["WEBHOOK_URL"] 
 BEARER_TOKEN = st.secrets["BEARER_TOKEN"] 
 
-def generate_session_id():
-    return str(uuid.uuid4())
-
-def send_message_to_llm(session_id, message):
-    headers = {
-        "Authorization": f"Bearer {BEARER_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "sessionId": session_id,
-        "chatInput": message
-    }
-    response = requests.post(WEBHOOK_URL, json=payload, headers=headers)
-    #print (response.json())
-    if response.status_code == 200:
-        return response.json()["output"]
-    else:
-        return f"Error: {response.status_code} - {response.text}"
-
 def main():
     st.title("FinRAGas - Lietuvos Banko Sprendimų Asistentas")
     st.markdown("*Išmanus draudimo sprendimų paieškos įrankis*")
     
     # Initialize session state
     if "messages" not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = new_chat_history()
     if "session_id" not in st.session_state:
         st.session_state.session_id = generate_session_id()
     with st.chat_message("assistant"):
             st.write('Nauji namai. Šis asistentas palaipsniui yra perkeliamas į naują adresą https://finragas.savaitgalioprojektai.lt. Kai asistentas pilnai persikels į naujus namus šie bus uždaryti ir atiduoti naujiems eksperimentams. Užsisaugokite nuorodą')
     # Display chat messages
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.write(message["content"])
+    display_chat_history(st.session_state.messages)
 
     # User input
     user_input = st.chat_input("Type your message here...")
@@ -51,18 +29,20 @@ def main():
             st.write(user_input)
 
 
-        # Get LLM response with spinner on while waiting
+        # Stream the LLM response into the chat, spinner on until it is complete
 
-        with st.spinner('Sekundėlę ...'):
-            llm_response = send_message_to_llm(st.session_state.session_id, user_input)
-        
+        errors = []
+        with st.chat_message("assistant"):
+            with st.spinner('Sekundėlę ...'):
+                llm_response = st.write_stream(
+                    stream_message_to_llm(WEBHOOK_URL, st.session_state.session_id, user_input, bearer_token=BEARER_TOKEN, errors=errors)
+                )
         
-        # Add LLM response to chat history
         
-        st.session_state.messages.append({"role": "assistant", "content": llm_response})
+        # Add LLM response to chat history; a failed turn is shown once and not kept
         
-        with st.chat_message("assistant"):
-            st.write(llm_response)
+        if not errors:
+            st.session_state.messages.append({"role": "assistant", "content": llm_response})
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,6 @@
 import streamlit as st
-import requests
-import uuid
 from supabase import create_client, Client
+from chat_utils import display_chat_history, generate_session_id, new_chat_history, stream_message_to_llm
 
 # Supabase setup
 SUPABASE_URL = "https://gcaoimrzwbnzvflendyb.supabase.co"
@@ -27,26 +26,21 @@ def signup(email: str, password: str):
         st.error(f"Signup failed: {str(e)}")
         return None
 
-def generate_session_id():
-    return str(uuid.uuid4())
-
 def init_session_state():
     if "auth" not in st.session_state:
         st.session_state.auth = None
     if "session_id" not in st.session_state:
         st.session_state.session_id = None
     if "messages" not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = new_chat_history()
 
 def display_chat():
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    display_chat_history(st.session_state.messages, older_label="Show earlier messages")
 
 def handle_logout():
     st.session_state.auth = None
     st.session_state.session_id = None
-    st.session_state.messages = []
+    st.session_state.messages = new_chat_history()
     st.rerun()
 
 def auth_ui():
@@ -90,29 +84,27 @@ def main():
             with st.chat_message("user"):
                 st.markdown(prompt)
 
-            # Prepare the payload
-            payload = {
-                "chatInput": prompt,
-                "sessionId": st.session_state.session_id
-            }
-            
             # Get the access token from the session
             access_token = st.session_state.auth.session.access_token
             
-            # Send request to webhook
+            # Stream the webhook response into the chat as it arrives
             headers = {
                 "Authorization": f"Bearer {access_token}"
             }
-            with st.spinner("AI is thinking..."):
-                response = requests.post(WEBHOOK_URL, json=payload, headers=headers)
-            
-            if response.status_code == 200:
-                ai_message = response.json().get("output", "Sorry, I couldn't generate a response.")
-                st.session_state.messages.append({"role": "assistant", "content": ai_message})
-                with st.chat_message("assistant"):
-                    st.markdown(ai_message)
+            errors = []
+            with st.chat_message("assistant"):
+                with st.spinner("AI is thinking..."):
+                    ai_message = st.write_stream(
+                        stream_message_to_llm(WEBHOOK_URL, st.session_state.session_id, prompt, headers=headers, errors=errors, inline_errors=False)
+                    )
+
+            # Errors are shown with st.error for this turn only, as before, and not kept
+            # in the history, including an answer that broke off part way
+            if errors:
+                for error in errors:
+                    st.error(f"Error: {error}")
             else:
-                st.error(f"Error: {response.status_code} - {response.text}")
+                st.session_state.messages.append({"role": "assistant", "content": ai_message})
 
 if __name__ == "__main__":
     main()
\ No newline at end of file